@@ -1,29 +1,95 @@
 import os
+import re
+import csv
 import time
 import datetime
 import requests
-import pandas as pd
 import logging
-from kubernetes import client, config
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from kubernetes import client, config, watch
 from dateutil import parser
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
+# Prefer a C JSON parser for Kubernetes and Prometheus responses
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
+
+# pyarrow is only needed when OUTPUT_FORMAT=parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # Configuration
 PROMETHEUS_URL = os.getenv("PROMETHEUS_URL")
 NAMESPACE = os.getenv('NAMESPACE', 'otel-demo')
 OUTPUT_FILE = os.getenv('OUTPUT_FILE', 'pod_metrics.csv')
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'csv').lower()  # 'csv' appends to OUTPUT_FILE, 'parquet' writes to PARQUET_DIR
+PARQUET_DIR = os.getenv('PARQUET_DIR', 'pod_metrics')
+PARQUET_FLUSH_CYCLES = int(os.getenv('PARQUET_FLUSH_CYCLES', 12))  # Cycles buffered before a Parquet file is written
 SLEEP_INTERVAL = int(os.getenv('SLEEP_INTERVAL', 5))  # Time in seconds between data fetches
+REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 10))  # Time in seconds before a Kubernetes API call gives up
+NODE_EVENTS_TTL = int(os.getenv('NODE_EVENTS_TTL', 30))  # Time in seconds node events are reused before being listed again
+WATCH_TIMEOUT = int(os.getenv('WATCH_TIMEOUT', 300))  # Time in seconds before a watch request is reopened
+PROMETHEUS_LIMITS_TTL = int(os.getenv('PROMETHEUS_LIMITS_TTL', 60))  # Time in seconds resource limit results are reused
+K8S_CONNECTION_POOL_MAXSIZE = int(os.getenv('K8S_CONNECTION_POOL_MAXSIZE', 32))  # Minimum connections kept open to the API server
+HEARTBEAT_INTERVAL = int(os.getenv('HEARTBEAT_INTERVAL', 60))  # Time in seconds after which an unchanged pod row is written anyway; 0 writes every row
+
+CSV_FIELDS = [
+    'Timestamp', 'Pod Name', 'CPU Usage (%)', 'Memory Usage (%)', 'Pod Status', 'Pod Reason', 'Pod Restarts',
+    'Ready Containers', 'Total Containers', 'Error Message',
+    'Pod Event Type', 'Pod Event Reason', 'Pod Event Age', 'Pod Event Source', 'Pod Event Message',
+    'Node Name', 'Event Reason', 'Event Age', 'Event Source', 'Event Message'
+]
+# Columns left out when deciding whether a pod's row changed: they advance every cycle on their own
+VOLATILE_FIELDS = {'Timestamp', 'Pod Event Age', 'Event Age'}
+# Columns that hold numbers or 'N/A'; Parquet stores the 'N/A' as null so the column keeps a numeric type
+NUMERIC_FIELDS = {'CPU Usage (%)', 'Memory Usage (%)'}
+COUNT_FIELDS = {'Pod Restarts', 'Ready Containers', 'Total Containers'}
 
 EXCLUDE_POD_NAMES = [
     "opensearch", "prometheus", "otelcol", "loadgenerator",
     "jaeger", "grafana", "featureflagservice"
 ]
+# Single alternation so each pod name is scanned once instead of once per excluded name
+_EXCLUDE_RE = re.compile("|".join(map(re.escape, EXCLUDE_POD_NAMES))) if EXCLUDE_POD_NAMES else None
 
 # Azure AD Authentication details from environment variables
 AZURE_AD_TENANT_ID = os.getenv("AZURE_AD_TENANT_ID")
 AZURE_AD_CLIENT_ID = os.getenv("AZURE_AD_CLIENT_ID")
 AZURE_AD_CLIENT_SECRET = os.getenv("AZURE_AD_CLIENT_SECRET")
 AZURE_MONITOR_RESOURCE = "https://prometheus.monitor.azure.com"
+TOKEN_REFRESH_MARGIN = 300  # Refresh the access token this many seconds before it expires
+
+# Shared HTTP session so Azure AD and Prometheus calls reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_TOKEN_CACHE = {"token": None, "exp": 0}
+_TOKEN_LOCK = threading.Lock()
+
+# Long-lived pool shared by every cycle so the node event LIST and Prometheus queries overlap
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+_NODE_EVENTS_CACHE = {"events": None, "fetched_at": 0}
+_QUERY_CACHE = {}  # PromQL query -> (fetched_at, result)
+_LAST_WRITTEN_ROWS = {}  # Pod name -> (row hash, written_at)
+
+# Slim projections of the pods and events in NAMESPACE keyed by UID, kept current by the watch threads
+_POD_CACHE = {}
+_EVENT_CACHE = {}
+_CACHE_SYNCED_AT = {}  # List function name -> monotonic time its cache was last confirmed current
+_CACHE_LOCK = threading.Lock()
+# A healthy watch confirms its cache at least once per watch request, so anything older means the watch is failing
+CACHE_MAX_AGE = WATCH_TIMEOUT + REQUEST_TIMEOUT
 
 # Logger setup
 logging.basicConfig(filename='error.log', level=logging.ERROR)
@@ -31,45 +97,152 @@ logging.basicConfig(filename='error.log', level=logging.ERROR)
 
 def initialize_k8s_client():
     config.load_kube_config()
-    return client.CoreV1Api()
+    # Each watch holds a connection open alongside the node event LIST; the client sizes its pool at cpu_count() * 5,
+    # which is raised on small hosts so connections beyond it are reused instead of reopened
+    configuration = client.Configuration.get_default_copy()
+    configuration.connection_pool_maxsize = max(configuration.connection_pool_maxsize, K8S_CONNECTION_POOL_MAXSIZE)
+    return client.CoreV1Api(client.ApiClient(configuration=configuration))
 
 
-def should_exclude_pod(pod_name):
-    return any(excluded in pod_name for excluded in EXCLUDE_POD_NAMES)
+class RawWatch(watch.Watch):
+    # Yield watch objects as plain dicts instead of running them through the OpenAPI model deserializer
+    def get_return_type(self, func):
+        return None
 
 
-def get_event_timestamp(event):
-    if event.last_timestamp:
-        return event.last_timestamp
-    if event.event_time:
-        return event.event_time
-    return event.first_timestamp
+def parse_timestamp(value):
+    return parser.isoparse(value) if value else None
+
+
+def project_pod(pod):
+    metadata, spec, status = pod.get('metadata') or {}, pod.get('spec') or {}, pod.get('status') or {}
+    return {
+        'uid': metadata.get('uid'),
+        'name': metadata.get('name'),
+        'phase': status.get('phase'),
+        'reason': status.get('reason'),
+        'container_statuses': status.get('containerStatuses') or [],
+        'node_name': spec.get('nodeName'),
+        'total_containers': len(spec.get('containers') or []),
+    }
+
+
+def project_event(event):
+    return {
+        'uid': (event.get('metadata') or {}).get('uid'),
+        'involved_object_name': (event.get('involvedObject') or {}).get('name'),
+        'type': event.get('type'),
+        'reason': event.get('reason'),
+        'source': (event.get('source') or {}).get('component'),
+        'message': event.get('message'),
+        'last_timestamp': parse_timestamp(event.get('lastTimestamp')),
+        'event_time': parse_timestamp(event.get('eventTime')),
+        'first_timestamp': parse_timestamp(event.get('firstTimestamp')),
+    }
+
+
+def list_raw(list_func, *args, **kwargs):
+    # Skip ApiClient.deserialize and parse the response body directly
+    response = list_func(*args, _preload_content=False, _request_timeout=REQUEST_TIMEOUT, **kwargs)
+    try:
+        return json_loads(response.data)
+    finally:
+        response.release_conn()
+
+
+def watch_resource(list_func, project, cache, synced, *args, **kwargs):
+    # LIST once to fill the cache, then apply WATCH deltas; any failure (e.g. 410 Gone) falls back to a fresh LIST
+    while True:
+        try:
+            resource_list = list_raw(list_func, *args, resource_version="0", **kwargs)
+            with _CACHE_LOCK:
+                cache.clear()
+                for obj in resource_list['items']:
+                    projected = project(obj)
+                    cache[projected['uid']] = projected
+                _CACHE_SYNCED_AT[list_func.__name__] = time.monotonic()
+            synced.set()
+            resource_version = resource_list['metadata']['resourceVersion']
+            while True:
+                for event in RawWatch().stream(list_func, *args, resource_version=resource_version,
+                                               timeout_seconds=WATCH_TIMEOUT,
+                                               _request_timeout=WATCH_TIMEOUT + REQUEST_TIMEOUT, **kwargs):
+                    obj = event['object']
+                    resource_version = obj['metadata']['resourceVersion']
+                    with _CACHE_LOCK:
+                        if event['type'] == 'DELETED':
+                            cache.pop(obj['metadata']['uid'], None)
+                        else:
+                            projected = project(obj)
+                            cache[projected['uid']] = projected
+                        _CACHE_SYNCED_AT[list_func.__name__] = time.monotonic()
+                # The watch request ran to its timeout without an error, so the cache is still current
+                with _CACHE_LOCK:
+                    _CACHE_SYNCED_AT[list_func.__name__] = time.monotonic()
+        except Exception as e:
+            logging.error(f"Error watching {list_func.__name__}, relisting: {e}")
+            time.sleep(SLEEP_INTERVAL)
+
+
+def start_watchers(v1):
+    # Only pod events are read, so events about Deployments, ReplicaSets, etc. are filtered out server-side
+    watches = [
+        (v1.list_namespaced_pod, project_pod, _POD_CACHE, {}),
+        (v1.list_namespaced_event, project_event, _EVENT_CACHE, {'field_selector': "involvedObject.kind=Pod"}),
+    ]
+    synced_flags = []
+    for list_func, project, cache, kwargs in watches:
+        synced = threading.Event()
+        threading.Thread(target=watch_resource, args=(list_func, project, cache, synced, NAMESPACE), kwargs=kwargs,
+                         daemon=True).start()
+        synced_flags.append((list_func.__name__, synced))
+    # Block until the initial LISTs are in, otherwise the first cycle would see no pods; the watch threads keep retrying
+    for name, synced in synced_flags:
+        while not synced.wait(REQUEST_TIMEOUT):
+            print(f"Waiting for the initial {name} in namespace {NAMESPACE}, see error.log")
 
 
 def should_exclude_pod(pod_name):
-    return any(excluded in pod_name for excluded in EXCLUDE_POD_NAMES)
+    return _EXCLUDE_RE is not None and _EXCLUDE_RE.search(pod_name) is not None
 
 
 def get_event_timestamp(event):
-    if event.last_timestamp:
-        return event.last_timestamp
-    if event.event_time:
-        return event.event_time
-    return event.first_timestamp
+    if event['last_timestamp']:
+        return event['last_timestamp']
+    if event['event_time']:
+        return event['event_time']
+    return event['first_timestamp']
+
+
+def format_age(age):
+    # Same text as str(age) with the microseconds dropped, built from the integer fields
+    minutes, seconds = divmod(age.seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    clock = f"{hours}:{minutes:02d}:{seconds:02d}"
+    if age.days:
+        return f"{age.days} day{'' if abs(age.days) == 1 else 's'}, {clock}"
+    return clock
 
 
 def get_access_token():
-    url = f"https://login.microsoftonline.com/{AZURE_AD_TENANT_ID}/oauth2/token"
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": AZURE_AD_CLIENT_ID,
-        "client_secret": AZURE_AD_CLIENT_SECRET,
-        "resource": AZURE_MONITOR_RESOURCE
-    }
-    response = requests.post(url, data=data)
-    response.raise_for_status()
-    token_data = response.json()
-    return token_data["access_token"]
+    # Queries run concurrently, so only one of them should refresh an expired token
+    with _TOKEN_LOCK:
+        if _TOKEN_CACHE["token"] and time.time() < _TOKEN_CACHE["exp"] - TOKEN_REFRESH_MARGIN:
+            return _TOKEN_CACHE["token"]
+        url = f"https://login.microsoftonline.com/{AZURE_AD_TENANT_ID}/oauth2/token"
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": AZURE_AD_CLIENT_ID,
+            "client_secret": AZURE_AD_CLIENT_SECRET,
+            "resource": AZURE_MONITOR_RESOURCE
+        }
+        response = _SESSION.post(url, data=data)
+        response.raise_for_status()
+        token_data = response.json()
+        expires_on = token_data.get("expires_on")
+        _TOKEN_CACHE["token"] = token_data["access_token"]
+        _TOKEN_CACHE["exp"] = float(expires_on) if expires_on else time.time() + float(token_data.get("expires_in", 0))
+        return _TOKEN_CACHE["token"]
 
 
 def query_prometheus(query):
@@ -78,52 +251,99 @@ def query_prometheus(query):
     url = f"{PROMETHEUS_URL}/api/v1/query"
     params = {"query": query}
     try:
-        response = requests.post(url, headers=headers, params=params)
+        response = _SESSION.post(url, headers=headers, params=params)
         response.raise_for_status()
-        data = response.json()
+        data = json_loads(response.content)
         return {item['metric']['pod']: float(item['value'][1]) for item in data['data']['result']}
     except requests.exceptions.RequestException as e:
         logging.error(f"An error occurred while querying Prometheus: {e}")
         return {}
+    except ValueError as e:
+        logging.error(f"Invalid JSON in Prometheus response: {e}")
+        return {}
 
 
-def get_pod_status(v1, pod_name, namespace):
+def query_prometheus_cached(query, ttl):
+    if ttl <= 0:
+        return query_prometheus(query)
+    now = time.monotonic()
+    cached = _QUERY_CACHE.get(query)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    result = query_prometheus(query)
+    if result:  # Failed queries return {} and are retried on the next cycle
+        _QUERY_CACHE[query] = (now, result)
+    return result
+
+
+def query_prometheus_concurrently(queries, ttls=None):
+    ttls = ttls or {}
+    return dict(zip(queries, _EXECUTOR.map(lambda name: query_prometheus_cached(queries[name], ttls.get(name, 0)),
+                                           queries)))
+
+
+def get_pod_status(pod):
+    if pod is None:
+        return 'NotFound', None, 0, 0, 0, 'Pod not found'
     try:
-        pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
-        status = pod.status.phase
-        reason = status if pod.status.reason is None else pod.status.reason
-        restarts = sum(c.restart_count for c in (pod.status.container_statuses or []))
-        ready_containers = sum(1 for c in (pod.status.container_statuses or []) if c.ready)
-        total_containers = len(pod.spec.containers)
+        status = pod['phase']
+        reason = status if pod['reason'] is None else pod['reason']
+        restarts = sum(c.get('restartCount', 0) for c in pod['container_statuses'])
+        ready_containers = sum(1 for c in pod['container_statuses'] if c.get('ready'))
+        total_containers = pod['total_containers']
         return status, reason, restarts, ready_containers, total_containers, None
-    except client.exceptions.ApiException as e:
-        return 'NotFound' if e.status == 404 else 'Error', None, 0, 0, 0, str(e)
     except Exception as e:
         return 'Unknown', None, 0, 0, 0, str(e)
 
 
-def get_pod_node_name(v1, pod_name, namespace):
+def get_pod_node_name(pod):
+    if pod is None:
+        return 'Unknown'
+    return pod['node_name']
+
+
+def group_events_by_object(events):
+    events_by_object = defaultdict(list)
+    for event in events:
+        events_by_object[event['involved_object_name']].append(event)
+    return events_by_object
+
+
+def list_events_by_object(list_func, *args, **kwargs):
     try:
-        pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
-        return pod.spec.node_name
+        events = [project_event(event) for event in list_raw(list_func, *args, resource_version="0", **kwargs)['items']]
     except Exception as e:
-        logging.error(f"Error getting node for pod {pod_name}: {e}")
-        return 'Unknown'
+        logging.error(f"Error listing events: {e}")
+        return None
+    return group_events_by_object(events)
+
 
+def get_node_events(v1):
+    # Node events change slowly, so the cluster-wide LIST is only repeated once the TTL has passed
+    now = time.monotonic()
+    if _NODE_EVENTS_CACHE["events"] is not None and now - _NODE_EVENTS_CACHE["fetched_at"] < NODE_EVENTS_TTL:
+        return _NODE_EVENTS_CACHE["events"]
+    events_by_node = list_events_by_object(v1.list_event_for_all_namespaces, field_selector="involvedObject.kind=Node")
+    if events_by_node is not None:
+        _NODE_EVENTS_CACHE.update(events=events_by_node, fetched_at=now)
+    return events_by_node
 
-def get_latest_pod_event(v1, pod_name, namespace):
+
+def get_latest_pod_event(pod_name, events_by_pod, now_utc):
+    if events_by_pod is None:
+        return {key: 'Unknown' for key in
+                ['Pod Event Type', 'Pod Event Reason', 'Pod Event Age', 'Pod Event Source', 'Pod Event Message']}
     try:
-        events = v1.list_namespaced_event(namespace, field_selector=f"involvedObject.name={pod_name}")
-        valid_events = [event for event in events.items if event.last_timestamp]
-        if valid_events:
-            latest_event = sorted(valid_events, key=lambda x: x.last_timestamp, reverse=True)[0]
-            event_age = datetime.datetime.now(datetime.timezone.utc) - latest_event.last_timestamp
+        latest_event = max((event for event in events_by_pod.get(pod_name, []) if event['last_timestamp']),
+                           key=lambda x: x['last_timestamp'], default=None)
+        if latest_event is not None:
+            event_age = now_utc - latest_event['last_timestamp']
             return {
-                'Pod Event Type': latest_event.type,
-                'Pod Event Reason': latest_event.reason,
-                'Pod Event Age': str(event_age).split('.')[0],
-                'Pod Event Source': latest_event.source.component,
-                'Pod Event Message': latest_event.message
+                'Pod Event Type': latest_event['type'],
+                'Pod Event Reason': latest_event['reason'],
+                'Pod Event Age': format_age(event_age),
+                'Pod Event Source': latest_event['source'],
+                'Pod Event Message': latest_event['message']
             }
         return {key: 'N/A' for key in
                 ['Pod Event Type', 'Pod Event Reason', 'Pod Event Age', 'Pod Event Source', 'Pod Event Message']}
@@ -133,22 +353,20 @@ def get_latest_pod_event(v1, pod_name, namespace):
                 ['Pod Event Type', 'Pod Event Reason', 'Pod Event Age', 'Pod Event Source', 'Pod Event Message']}
 
 
-def get_latest_event_details_node(v1, node_name):
+def get_latest_event_details_node(node_name, events_by_node, now_utc):
+    if events_by_node is None:
+        return {key: 'Unknown' for key in ['Node Name', 'Event Reason', 'Event Age', 'Event Source', 'Event Message']}
     try:
-        events = v1.list_event_for_all_namespaces(
-            field_selector=f"involvedObject.kind=Node,involvedObject.name={node_name}")
-        valid_events = [event for event in events.items if get_event_timestamp(event)]
-        if valid_events:
-            latest_event = sorted(valid_events, key=lambda x: get_event_timestamp(x), reverse=True)[0]
-            event_timestamp = get_event_timestamp(latest_event)
-            event_timestamp = parser.parse(event_timestamp) if isinstance(event_timestamp, str) else event_timestamp
-            event_age = datetime.datetime.now(datetime.timezone.utc) - event_timestamp
+        latest_event = max((event for event in events_by_node.get(node_name, []) if get_event_timestamp(event)),
+                           key=get_event_timestamp, default=None)
+        if latest_event is not None:
+            event_age = now_utc - get_event_timestamp(latest_event)
             return {
                 'Node Name': node_name,
-                'Event Reason': latest_event.reason,
-                'Event Age': str(event_age).split('.')[0],
-                'Event Source': latest_event.source.component,
-                'Event Message': latest_event.message
+                'Event Reason': latest_event['reason'],
+                'Event Age': format_age(event_age),
+                'Event Source': latest_event['source'],
+                'Event Message': latest_event['message']
             }
         return {key: 'N/A' for key in ['Node Name', 'Event Reason', 'Event Age', 'Event Source', 'Event Message']}
     except Exception as e:
@@ -159,30 +377,46 @@ def get_latest_event_details_node(v1, node_name):
 def collect_pod_metrics(v1):
     print(f"Fetching data for pods in namespace {NAMESPACE}")
 
-    current_pods = v1.list_namespaced_pod(namespace=NAMESPACE)
-    current_pod_states = {pod.metadata.name: pod.status.phase for pod in current_pods.items if
-                          not should_exclude_pod(pod.metadata.name)}
-
-    cpu_usage_query = f"100 * max(rate(container_cpu_usage_seconds_total{{namespace=\"{NAMESPACE}\"}}[5m])) by (pod)"
-    memory_usage_query = f"container_memory_working_set_bytes{{namespace=\"{NAMESPACE}\"}} / 1024 / 1024"
-    memory_limit_query = f"kube_pod_container_resource_limits{{resource=\"memory\", namespace=\"{NAMESPACE}\"}} / 1024 / 1024"
-
-    cpu_usage_data = query_prometheus(cpu_usage_query)
-    memory_usage_data = query_prometheus(memory_usage_query)
-    memory_limit_data = query_prometheus(memory_limit_query)
+    # Pods and pod events come from the watch caches, so a cycle makes no pod or event LIST calls
+    with _CACHE_LOCK:
+        now = time.monotonic()
+        stale = [name for name, synced_at in _CACHE_SYNCED_AT.items() if now - synced_at > CACHE_MAX_AGE]
+        pods = list(_POD_CACHE.values())
+        events = list(_EVENT_CACHE.values())
+    # Writing a frozen snapshot as current pod state would corrupt the dataset, so skip the cycle until the watch recovers
+    if stale:
+        logging.error(f"Skipping cycle, {', '.join(stale)} cache not synced for over {CACHE_MAX_AGE}s")
+        return []
+    pod_by_name = {pod['name']: pod for pod in pods}
+    events_by_pod = group_events_by_object(events)
+    events_by_node_future = _EXECUTOR.submit(get_node_events, v1)
+
+    queries = {
+        'cpu_usage': f"100 * max(rate(container_cpu_usage_seconds_total{{namespace=\"{NAMESPACE}\"}}[5m])) by (pod)",
+        'memory_usage': f"container_memory_working_set_bytes{{namespace=\"{NAMESPACE}\"}} / 1024 / 1024",
+        'memory_limit': f"kube_pod_container_resource_limits{{resource=\"memory\", namespace=\"{NAMESPACE}\"}} / 1024 / 1024",
+    }
+    # Limits only change when a pod is redeployed, so they are not re-queried every cycle
+    results = query_prometheus_concurrently(queries, ttls={'memory_limit': PROMETHEUS_LIMITS_TTL})
+    cpu_usage_data = results['cpu_usage']
+    memory_usage_data = results['memory_usage']
+    memory_limit_data = results['memory_limit']
+    events_by_node = events_by_node_future.result()
 
     data = []
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    now_utc = datetime.datetime.now(datetime.timezone.utc)  # Reference time for every event age in this cycle
     for pod in set(memory_usage_data.keys()).union(memory_limit_data.keys()):
         if should_exclude_pod(pod):
             continue
         memory_usage_percentage = (memory_usage_data.get(pod, 0) / memory_limit_data.get(pod,
                                                                                          0)) * 100 if memory_limit_data.get(
             pod, 0) > 0 else 'N/A'
-        status, reason, restarts, ready_containers, total_containers, error_message = get_pod_status(v1, pod, NAMESPACE)
-        latest_pod_event_details = get_latest_pod_event(v1, pod, NAMESPACE)
-        node_name = get_pod_node_name(v1, pod, NAMESPACE)
-        latest_event_node_details = get_latest_event_details_node(v1, node_name)
+        pod_obj = pod_by_name.get(pod)
+        status, reason, restarts, ready_containers, total_containers, error_message = get_pod_status(pod_obj)
+        latest_pod_event_details = get_latest_pod_event(pod, events_by_pod, now_utc)
+        node_name = get_pod_node_name(pod_obj)
+        latest_event_node_details = get_latest_event_details_node(node_name, events_by_node, now_utc)
         data.append({
             'Timestamp': timestamp,
             'Pod Name': pod,
@@ -201,21 +435,106 @@ def collect_pod_metrics(v1):
     return data
 
 
-def write_to_csv(data):
-    df = pd.DataFrame(data)
-    write_header = not os.path.isfile(OUTPUT_FILE)
-    df.to_csv(OUTPUT_FILE, index=False, mode='a', header=write_header)
+def drop_unchanged_rows(data):
+    # Keep a pod's row only if something other than the volatile columns changed, or its heartbeat is due.
+    # The kept rows' hashes are returned rather than stored, so a failed write does not suppress them next cycle
+    if HEARTBEAT_INTERVAL <= 0:
+        return data, {}
+    now = time.monotonic()
+    changed_rows = []
+    pending = {}
+    for row in data:
+        pod = row['Pod Name']
+        row_hash = hash(tuple(row.get(field) for field in CSV_FIELDS if field not in VOLATILE_FIELDS))
+        last_written = _LAST_WRITTEN_ROWS.get(pod)
+        if last_written is None or last_written[0] != row_hash or now - last_written[1] >= HEARTBEAT_INTERVAL:
+            pending[pod] = (row_hash, now)
+            changed_rows.append(row)
+    # Forget pods that are no longer reported, so a pod coming back is written straight away
+    reported_pods = {row['Pod Name'] for row in data}
+    for pod in _LAST_WRITTEN_ROWS.keys() - reported_pods:
+        del _LAST_WRITTEN_ROWS[pod]
+    return changed_rows, pending
+
+
+def open_csv_writer():
+    # The file stays open for the life of the process; the header is only written to a new or empty file
+    write_header = not os.path.isfile(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) == 0
+    csv_file = open(OUTPUT_FILE, 'a', newline='', buffering=1024 * 1024)
+    writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+    if write_header:
+        writer.writeheader()
+    return csv_file, writer
+
+
+def write_to_csv(csv_file, writer, data):
+    writer.writerows(data)
+    csv_file.flush()
     print(f"Data written to {OUTPUT_FILE}")
 
 
+def new_parquet_buffer():
+    # Rows are buffered column by column, ready for pa.Table.from_pydict
+    return {field: [] for field in CSV_FIELDS + ['date']}
+
+
+def buffer_rows(buffer, data):
+    for row in data:
+        for field in CSV_FIELDS:
+            value = row.get(field)
+            if field in NUMERIC_FIELDS and not isinstance(value, (int, float)):
+                value = None
+            buffer[field].append(value)
+        buffer['date'].append(row['Timestamp'][:10])
+
+
+def parquet_schema():
+    # Fixed types, so a flush where a column happens to be all nulls still matches the other files
+    def field_type(field):
+        if field in NUMERIC_FIELDS:
+            return pa.float64()
+        if field in COUNT_FIELDS:
+            return pa.int64()
+        return pa.string()
+    return pa.schema([(field, field_type(field)) for field in CSV_FIELDS + ['date']])
+
+
+def write_to_parquet(buffer):
+    if not buffer['Timestamp']:
+        return
+    table = pa.Table.from_pydict(buffer, schema=parquet_schema())
+    pq.write_to_dataset(table, root_path=PARQUET_DIR, partition_cols=['date'], compression='zstd')
+    for column in buffer.values():
+        column.clear()
+    print(f"Data written to {PARQUET_DIR}")
+
+
 def main():
     v1 = initialize_k8s_client()
+    start_watchers(v1)
     last_known_pod_states = {}
+    if OUTPUT_FORMAT == 'parquet':
+        if pa is None:
+            raise SystemExit("OUTPUT_FORMAT=parquet requires pyarrow")
+        parquet_buffer = new_parquet_buffer()
+        buffered_cycles = 0
+    else:
+        csv_file, writer = open_csv_writer()
 
     while True:
         try:
-            data = collect_pod_metrics(v1)
-            write_to_csv(data)
+            data, written_rows = drop_unchanged_rows(collect_pod_metrics(v1))
+            if OUTPUT_FORMAT == 'parquet':
+                # Buffered rows stay in the buffer until a flush succeeds, so they count as written once buffered
+                buffer_rows(parquet_buffer, data)
+                _LAST_WRITTEN_ROWS.update(written_rows)
+                buffered_cycles += 1
+                if buffered_cycles >= PARQUET_FLUSH_CYCLES:
+                    write_to_parquet(parquet_buffer)
+                    buffered_cycles = 0
+            else:
+                write_to_csv(csv_file, writer, data)
+                _LAST_WRITTEN_ROWS.update(written_rows)
             time.sleep(SLEEP_INTERVAL)
         except KeyboardInterrupt:
             print("Script interrupted, exiting.")
@@ -223,6 +542,11 @@ def main():
         except Exception as e:
             logging.error(f"An error occurred: {e}")
 
+    if OUTPUT_FORMAT == 'parquet':
+        write_to_parquet(parquet_buffer)
+    else:
+        csv_file.close()
+
 
 if __name__ == "__main__":
     main()
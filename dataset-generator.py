@@ -1,37 +1,79 @@
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import time
 import datetime
 from kubernetes import client, config
 from dateutil import parser
 import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Prefer a C JSON parser for Prometheus responses
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
 
 # Configuration
 PROMETHEUS_URL = 'http://127.0.0.1:36007'
 NAMESPACE = 'otel-demo'
 OUTPUT_FILE = 'pod_metrics.csv'
 SLEEP_INTERVAL = 5  # Time in seconds between data fetches
+REQUEST_TIMEOUT = 10  # Time in seconds before a Kubernetes API call gives up
+NODE_EVENTS_TTL = 30  # Time in seconds node events are reused before being listed again
+PROMETHEUS_LIMITS_TTL = 60  # Time in seconds resource limit query results are reused
+HEARTBEAT_INTERVAL = 60  # Time in seconds after which an unchanged pod row is written anyway; 0 writes every row
+K8S_CONNECTION_POOL_MAXSIZE = 32  # Minimum connections kept open to the API server, enough for the concurrent per-pod calls
 
 # List of pod names to exclude
 EXCLUDE_POD_NAMES = [
     "opensearch", "prometheus", "otelcol", "loadgenerator",
     "jaeger", "grafana", "featureflagservice"
 ]
+# Single alternation so each pod name is scanned once instead of once per excluded name
+_EXCLUDE_RE = re.compile("|".join(map(re.escape, EXCLUDE_POD_NAMES))) if EXCLUDE_POD_NAMES else None
+
+
+# Shared HTTP session so Prometheus queries reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Long-lived pool shared by every cycle so the Kubernetes LISTs and Prometheus queries overlap
+_EXECUTOR = ThreadPoolExecutor(max_workers=16)
 
+# Last cluster-wide node event LIST, reused until NODE_EVENTS_TTL has passed
+_NODE_EVENTS_CACHE = {"events": None, "fetched_at": 0}
 
-# Initialize Kubernetes client
+# Last result of each cached Prometheus query, as (fetched_at, result)
+_QUERY_CACHE = {}
+
+# Columns left out when deciding whether a pod's row changed: they advance every cycle on their own
+VOLATILE_FIELDS = {'Timestamp', 'Pod Event Age', 'Event Age'}
+# Hash of the last row written for each pod, as (row hash, written_at)
+_LAST_WRITTEN_ROWS = {}
+
+# Initialize Kubernetes client, raising its cpu_count() * 5 pool on small hosts so concurrent calls keep their connections
 config.load_kube_config()
-v1 = client.CoreV1Api()
+k8s_configuration = client.Configuration.get_default_copy()
+k8s_configuration.connection_pool_maxsize = max(k8s_configuration.connection_pool_maxsize, K8S_CONNECTION_POOL_MAXSIZE)
+v1 = client.CoreV1Api(client.ApiClient(configuration=k8s_configuration))
 
 # Function to check if a pod should be excluded
 def should_exclude_pod(pod_name):
-    return any(excluded in pod_name for excluded in EXCLUDE_POD_NAMES)
+    return _EXCLUDE_RE is not None and _EXCLUDE_RE.search(pod_name) is not None
 
 
 # Function to get pod status and additional details
-def get_pod_status(pod_name, namespace):
+def get_pod_status(pod_name, pod):
+    if pod is None:
+        return 'NotFound', None, 0, 0, 0, f'Pod {pod_name} not found'
     try:
-        pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
         status = pod.status.phase
 
         # Initialize variables for restart count and reasons
@@ -58,22 +100,14 @@ def get_pod_status(pod_name, namespace):
                     reason = container.state.terminated.reason or container.state.terminated.exit_code
 
         return status, reason, restarts, ready_containers, total_containers, None  # Additional details included
-    except client.exceptions.ApiException as e:
-        if e.status == 404:
-            return 'NotFound', None, 0, 0, 0, f'Pod {pod_name} not found'
-        else:
-            return 'Error', None, 0, 0, 0, str(e)
     except Exception as e:
         return 'Unknown', None, 0, 0, 0, str(e)
 
 # Function to get the node name for a pod
-def get_pod_node_name(pod_name, namespace):
-    try:
-        pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
-        return pod.spec.node_name
-    except Exception as e:
-        print(f"Error getting node for pod {pod_name}: {e}")
+def get_pod_node_name(pod):
+    if pod is None:
         return 'Unknown'
+    return pod.spec.node_name
 
 def get_event_timestamp(event):
     """Get the most relevant timestamp from the event."""
@@ -83,15 +117,53 @@ def get_event_timestamp(event):
         return event.event_time
     return event.first_timestamp
 
+def format_age(age):
+    """Format a timedelta like str(age) without the microseconds."""
+    minutes, seconds = divmod(age.seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    clock = f"{hours}:{minutes:02d}:{seconds:02d}"
+    if age.days:
+        return f"{age.days} day{'' if abs(age.days) == 1 else 's'}, {clock}"
+    return clock
+
+# Function to fetch events with a single LIST, served from the apiserver watch cache, and bucket them by involved object name
+def list_events_by_object(list_func, *args, **kwargs):
+    try:
+        events = list_func(*args, resource_version="0", _request_timeout=REQUEST_TIMEOUT, **kwargs).items
+    except Exception as e:
+        print(f"Error listing events: {e}")
+        return None
+    events_by_object = defaultdict(list)
+    for event in events:
+        events_by_object[event.involved_object.name].append(event)
+    return events_by_object
+
+# Function to get node events, listing them again only once the cached copy is older than NODE_EVENTS_TTL
+def get_node_events():
+    now = time.monotonic()
+    if _NODE_EVENTS_CACHE["events"] is not None and now - _NODE_EVENTS_CACHE["fetched_at"] < NODE_EVENTS_TTL:
+        return _NODE_EVENTS_CACHE["events"]
+    events_by_node = list_events_by_object(v1.list_event_for_all_namespaces, field_selector="involvedObject.kind=Node")
+    if events_by_node is not None:
+        _NODE_EVENTS_CACHE.update(events=events_by_node, fetched_at=now)
+    return events_by_node
+
 # Function to get the latest event details for a pod
-def get_latest_pod_event(pod_name, namespace):
+def get_latest_pod_event(pod_name, events_by_pod, now_utc):
+    if events_by_pod is None:
+        return {
+            'Pod Event Type': 'Error',
+            'Pod Event Reason': 'Unknown',
+            'Pod Event Age': 'Unknown',
+            'Pod Event Source': 'Unknown',
+            'Pod Event Message': 'Unknown'
+        }
     try:
-        events = v1.list_namespaced_event(namespace, field_selector=f"involvedObject.name={pod_name}")
-        valid_events = [event for event in events.items if event.last_timestamp]
-        if valid_events:
-            latest_event = sorted(valid_events, key=lambda x: x.last_timestamp, reverse=True)[0]
-            event_age = datetime.datetime.now(datetime.timezone.utc) - latest_event.last_timestamp
-            event_age_str = str(event_age).split('.')[0]  # Convert to string and remove microseconds
+        latest_event = max((event for event in events_by_pod.get(pod_name, []) if event.last_timestamp),
+                           key=lambda x: x.last_timestamp, default=None)
+        if latest_event is not None:
+            event_age = now_utc - latest_event.last_timestamp
+            event_age_str = format_age(event_age)
 
             return {
                 'Pod Event Type': latest_event.type,
@@ -117,19 +189,26 @@ def get_latest_pod_event(pod_name, namespace):
             'Pod Event Message': 'Unknown'
         }
 
-def get_latest_event_details_node(node_name):
+def get_latest_event_details_node(node_name, events_by_node, now_utc):
+    if events_by_node is None:
+        return {
+            'Node Name': node_name,
+            'Event Reason': 'Unknown',
+            'Event Age': 'Unknown',
+            'Event Source': 'Unknown',
+            'Event Message': 'Unknown'
+        }
     try:
-        events = v1.list_event_for_all_namespaces(field_selector=f"involvedObject.kind=Node,involvedObject.name={node_name}")
-        valid_events = [event for event in events.items if get_event_timestamp(event)]
-        if valid_events:
-            latest_event = sorted(valid_events, key=lambda x: get_event_timestamp(x), reverse=True)[0]
+        latest_event = max((event for event in events_by_node.get(node_name, []) if get_event_timestamp(event)),
+                           key=get_event_timestamp, default=None)
+        if latest_event is not None:
             event_timestamp = get_event_timestamp(latest_event)
 
             # Check if event_timestamp is already a datetime object
             if isinstance(event_timestamp, str):
                 event_timestamp = parser.parse(event_timestamp)
-            event_age = datetime.datetime.now(datetime.timezone.utc) - event_timestamp
-            event_age_str = str(event_age).split('.')[0]  # Convert to string and remove microseconds
+            event_age = now_utc - event_timestamp
+            event_age_str = format_age(event_age)
 
             return {
                 'Node Name': node_name,
@@ -155,13 +234,14 @@ def get_latest_event_details_node(node_name):
             'Event Message': 'Unknown'
         }
 # Function to get the latest event reason for a pod
-def get_latest_event_reason(pod_name, namespace):
+def get_latest_event_reason(pod_name, events_by_pod):
+    if events_by_pod is None:
+        return 'Unknown'
     try:
-        events = v1.list_namespaced_event(namespace, field_selector=f"involvedObject.name={pod_name}")
-        # Filter out events with None last_timestamp and sort the rest
-        valid_events = [event for event in events.items if event.last_timestamp]
-        if valid_events:
-            latest_event = sorted(valid_events, key=lambda x: x.last_timestamp, reverse=True)[0]
+        # Skip events with None last_timestamp and pick the newest of the rest
+        latest_event = max((event for event in events_by_pod.get(pod_name, []) if event.last_timestamp),
+                           key=lambda x: x.last_timestamp, default=None)
+        if latest_event is not None:
             return latest_event.reason
         return 'No recent events'
     except Exception as e:
@@ -179,9 +259,9 @@ def get_last_log_entry(pod_name, namespace):
 # Function to query Prometheus
 def query_prometheus(query):
     try:
-        response = requests.get(f'{PROMETHEUS_URL}/api/v1/query', params={'query': query})
+        response = _SESSION.get(f'{PROMETHEUS_URL}/api/v1/query', params={'query': query})
         response.raise_for_status()
-        results = response.json()['data']['result']
+        results = json_loads(response.content)['data']['result']
         return {item['metric']['pod']: float(item['value'][1]) for item in results}
     except requests.exceptions.HTTPError as errh:
         print ("Http Error:", errh)
@@ -191,8 +271,48 @@ def query_prometheus(query):
         print ("Timeout Error:", errt)
     except requests.exceptions.RequestException as err:
         print ("Oops: Something Else", err)
+    except ValueError as errj:
+        print ("Invalid JSON:", errj)
     return {}
 
+# Function to reuse a Prometheus query result for ttl seconds; failed queries return {} and are not cached
+def query_prometheus_cached(query, ttl):
+    if ttl <= 0:
+        return query_prometheus(query)
+    now = time.monotonic()
+    cached = _QUERY_CACHE.get(query)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    result = query_prometheus(query)
+    if result:
+        _QUERY_CACHE[query] = (now, result)
+    return result
+
+# Function to run independent Prometheus queries in parallel, keyed like the input dict
+def query_prometheus_concurrently(queries, ttls=None):
+    ttls = ttls or {}
+    return dict(zip(queries, _EXECUTOR.map(lambda name: query_prometheus_cached(queries[name], ttls.get(name, 0)), queries)))
+
+# Function to keep a pod's row only if something other than the volatile columns changed, or its heartbeat is due
+def drop_unchanged_rows(data):
+    if HEARTBEAT_INTERVAL <= 0:
+        return data, {}
+    now = time.monotonic()
+    changed_rows = []
+    pending = {}  # Recorded in _LAST_WRITTEN_ROWS by the caller once the rows are on disk
+    for row in data:
+        pod = row['Pod Name']
+        row_hash = hash(tuple(value for field, value in row.items() if field not in VOLATILE_FIELDS))
+        last_written = _LAST_WRITTEN_ROWS.get(pod)
+        if last_written is None or last_written[0] != row_hash or now - last_written[1] >= HEARTBEAT_INTERVAL:
+            pending[pod] = (row_hash, now)
+            changed_rows.append(row)
+    # Forget pods that are no longer reported, so a pod coming back is written straight away
+    reported_pods = {row['Pod Name'] for row in data}
+    for pod in _LAST_WRITTEN_ROWS.keys() - reported_pods:
+        del _LAST_WRITTEN_ROWS[pod]
+    return changed_rows, pending
+
 # Function to calculate memory usage percentage
 def calculate_percentage(usage, limit):
     return (usage / limit) * 100 if limit > 0 else 'N/A'
@@ -205,9 +325,12 @@ while True:
     try:
         print(f"Fetching data for pods in namespace {NAMESPACE}")
 
-        # Fetch current state of all pods in the namespace
-        current_pods = v1.list_namespaced_pod(namespace=NAMESPACE)
-        current_pod_states = {pod.metadata.name: pod.status.phase for pod in current_pods.items if not should_exclude_pod(pod.metadata.name)}
+        # Fetch current state of all pods in the namespace with a single LIST served from the apiserver watch cache,
+        # likewise one LIST each for pod and node events; they run in the background while Prometheus is queried
+        current_pods_future = _EXECUTOR.submit(v1.list_namespaced_pod, NAMESPACE, resource_version="0", _request_timeout=REQUEST_TIMEOUT)
+        events_by_pod_future = _EXECUTOR.submit(list_events_by_object, v1.list_namespaced_event, NAMESPACE,
+                                                field_selector="involvedObject.kind=Pod")
+        events_by_node_future = _EXECUTOR.submit(get_node_events)
 
         # Prometheus queries
         cpu_usage_query = f"100 * max(rate(container_cpu_usage_seconds_total{{namespace=\"{NAMESPACE}\"}}[5m])) by (pod)"
@@ -222,15 +345,31 @@ while True:
         network_transmit_errors_query = f"sum(rate(container_network_transmit_errors_total{{namespace=\"{NAMESPACE}\"}}[5m])) by (pod)"
 
 
-        # Fetch data from Prometheus
-        cpu_usage_data = query_prometheus(cpu_usage_query)
-        memory_usage_data = query_prometheus(memory_usage_query)
-        memory_limit_data = query_prometheus(memory_limit_query)
-        network_traffic_data = query_prometheus(network_traffic_query)
-        network_receive_data = query_prometheus(network_receive_query)
-        network_transmit_data = query_prometheus(network_transmit_query)
-        network_receive_errors_data = query_prometheus(network_receive_errors_query)
-        network_transmit_errors_data = query_prometheus(network_transmit_errors_query)
+        # Fetch data from Prometheus, all queries in flight at once
+        results = query_prometheus_concurrently({
+            'cpu_usage': cpu_usage_query,
+            'memory_usage': memory_usage_query,
+            'memory_limit': memory_limit_query,
+            'network_traffic': network_traffic_query,
+            'network_receive': network_receive_query,
+            'network_transmit': network_transmit_query,
+            'network_receive_errors': network_receive_errors_query,
+            'network_transmit_errors': network_transmit_errors_query,
+        }, ttls={'memory_limit': PROMETHEUS_LIMITS_TTL})  # Limits only change when a pod is redeployed
+        cpu_usage_data = results['cpu_usage']
+        memory_usage_data = results['memory_usage']
+        memory_limit_data = results['memory_limit']
+        network_traffic_data = results['network_traffic']
+        network_receive_data = results['network_receive']
+        network_transmit_data = results['network_transmit']
+        network_receive_errors_data = results['network_receive_errors']
+        network_transmit_errors_data = results['network_transmit_errors']
+
+        current_pods = current_pods_future.result()
+        pod_by_name = {pod.metadata.name: pod for pod in current_pods.items}
+        events_by_pod = events_by_pod_future.result()
+        events_by_node = events_by_node_future.result()
+        current_pod_states = {pod.metadata.name: pod.status.phase for pod in current_pods.items if not should_exclude_pod(pod.metadata.name)}
 
         # Check for changes in pod states
         for pod_name, current_status in current_pod_states.items():
@@ -250,17 +389,21 @@ while True:
         # Prepare data for CSV
         data = []
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for pod in set(memory_usage_data.keys()).union(memory_limit_data.keys()):
-            if should_exclude_pod(pod):
-                continue  # Skip this pod if it matches the exclude list
+        now_utc = datetime.datetime.now(datetime.timezone.utc)  # Reference time for every event age in this cycle
+        # Skip pods that match the exclude list
+        pods_to_report = [pod for pod in memory_usage_data.keys() | memory_limit_data.keys() if not should_exclude_pod(pod)]
+        # Log tails are the only per-pod API call left, so fetch them all concurrently
+        last_log_entries = dict(zip(pods_to_report, _EXECUTOR.map(lambda pod: get_last_log_entry(pod, NAMESPACE), pods_to_report)))
+        for pod in pods_to_report:
             memory_usage_percentage = calculate_percentage(memory_usage_data.get(pod, 0), memory_limit_data.get(pod, 0))
             #status, error_message = get_pod_status(pod, NAMESPACE)
-            event_reason = get_latest_event_reason(pod, NAMESPACE)
-            node_name = get_pod_node_name(pod, NAMESPACE)
-            last_log_entry = get_last_log_entry(pod, NAMESPACE)
-            status, reason, restarts, ready_containers, total_containers, error_message = get_pod_status(pod, NAMESPACE)
-            latest_pod_event_details = get_latest_pod_event(pod, NAMESPACE)
-            latest_event_node_details = get_latest_event_details_node(node_name)
+            pod_obj = pod_by_name.get(pod)
+            event_reason = get_latest_event_reason(pod, events_by_pod)
+            node_name = get_pod_node_name(pod_obj)
+            last_log_entry = last_log_entries[pod]
+            status, reason, restarts, ready_containers, total_containers, error_message = get_pod_status(pod, pod_obj)
+            latest_pod_event_details = get_latest_pod_event(pod, events_by_pod, now_utc)
+            latest_event_node_details = get_latest_event_details_node(node_name, events_by_node, now_utc)
             data.append({
                 'Timestamp': timestamp,
                 'Pod Name': pod,
@@ -286,16 +429,22 @@ while True:
                 # Additional data can be added here
             })
 
-        # Create DataFrame
-        df = pd.DataFrame(data)
+        # Drop rows for pods whose state has not changed since the last write
+        data, written_rows = drop_unchanged_rows(data)
+
+        # An empty DataFrame would write a blank line in place of the header
+        if data:
+            # Create DataFrame
+            df = pd.DataFrame(data)
 
-        # Check if the file exists to decide on writing the header
-        if not os.path.isfile(OUTPUT_FILE):
-            df.to_csv(OUTPUT_FILE, index=False, mode='w', header=True)
-        else:
-            df.to_csv(OUTPUT_FILE, index=False, mode='a', header=False)
+            # Check if the file exists to decide on writing the header
+            if not os.path.isfile(OUTPUT_FILE):
+                df.to_csv(OUTPUT_FILE, index=False, mode='w', header=True)
+            else:
+                df.to_csv(OUTPUT_FILE, index=False, mode='a', header=False)
 
-        print(f"Data written to {OUTPUT_FILE}")
+            print(f"Data written to {OUTPUT_FILE}")
+            _LAST_WRITTEN_ROWS.update(written_rows)
 
         time.sleep(SLEEP_INTERVAL)
 